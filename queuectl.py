@@ -6,10 +6,10 @@ DLQ, persistence (SQLite), and configuration management.
 Features
 - enqueue jobs with JSON payload
 - multiple worker processes (graceful stop)
-- retry on non‑zero exit statuses with exponential backoff delay = base ** attempts
+- retry on non‑zero exit statuses with exponential backoff delay = min(base ** attempts, max_backoff), ±20% jitter
 - move to DLQ after max_retries
 - persistent SQLite storage under ~/.queuectl/queue.db (overridable via QUEUECTL_DB_PATH)
-- config get/set for retry base, default max_retries, and job timeout
+- config get/set for retry base, default max_retries, job timeout, and claim/commit batching
 - list jobs by state, status summary, DLQ list & retry
 
 Usage examples
@@ -24,144 +24,414 @@ Usage examples
 
 Notes
 - "graceful stop": run `./queuectl.py worker stop` — workers finish current job then exit.
-- Commands are executed in /bin/sh via subprocess with shell=True. Exit code 0 = success.
+- Idle workers back off exponentially (0.1s up to 30s) and are woken early through ~/.queuectl/wakeup.fifo
+  whenever a job is enqueued or retried.
+- Commands are executed in /bin/sh via subprocess with shell=True, except plain `program arg ...` commands with no
+  shell syntax, which are exec'd directly to skip the extra shell process. Exit code 0 = success.
 - For delayed (backoff) retries we use a run_at timestamp the worker respects.
-- Basic output logging is stored in job_logs table.
+- Basic output logging (the last 64 KiB of stdout / stderr) is stored in job_logs table, capped to the most
+  recent JOB_LOGS_KEEP rows.
+- Every connection runs in WAL mode with synchronous=NORMAL and a busy timeout.
 """
 
 import argparse
+import atexit
+import errno
 import json
+import mmap
 import os
+import pathlib
+import queue
+import random
+import re
+import select
+import shutil
 import signal
+import socket
 import sqlite3
 import subprocess
 import sys
+import threading
 import time
+import zlib
+from collections import deque
 from contextlib import contextmanager
-from datetime import datetime, timedelta, timezone
-from multiprocessing import Process, current_process
-from typing import Optional, Dict, Any
+from functools import lru_cache
+from datetime import datetime, timezone
+import multiprocessing
+from typing import Optional, Dict, Any, List, Callable
+
+try:
+    import orjson  # optional: faster JSON output for list / dlq list
+except ImportError:
+    orjson = None
 
 APP_DIR = os.path.expanduser("~/.queuectl")
 DB_PATH = os.environ.get("QUEUECTL_DB_PATH", os.path.join(APP_DIR, "queue.db"))
 STOP_FILE = os.path.join(APP_DIR, "workers.stop")
+STOP_FLAG = os.path.join(APP_DIR, "workers.flag")  # one byte, mmap'd by workers; nonzero = stop
+WAKEUP_FIFO = os.path.join(APP_DIR, "wakeup.fifo")
 DEFAULT_BASE = 2  # backoff base
 DEFAULT_MAX_RETRIES = 3
 DEFAULT_TIMEOUT = 300  # seconds
-
-ISO = "%Y-%m-%dT%H:%M:%SZ"
+DEFAULT_LOCAL_QUEUE_SIZE = 1  # jobs claimed per transaction; claimed jobs can't be taken by idle peers
+DEFAULT_BATCH_DELAY_MS = 100  # max time a finished job's writes wait before being committed
+DEFAULT_MAX_BACKOFF = 3600  # seconds; cap on a single retry delay
+BACKOFF_JITTER = 0.2  # retry delays are spread by ±20% so failures don't retry in lockstep
+CONFIG_KEYS = ("base", "default_max_retries", "timeout", "max_backoff", "local_queue_size", "complete_job_batch_delay")
+JOB_SHARDS = 64  # jobs are hashed into this many shards; worker slot i of N prefers shards with shard % N == i
+JOB_LOGS_KEEP = 10000  # most recent job_logs rows kept; older ones are trimmed on insert
+OUTPUT_CAP = 64 * 1024  # bytes of stdout / stderr kept per job (the tail)
+OUTPUT_CHUNK = 4096
+FETCH_SIZE = 500  # rows per fetchmany() when streaming list output
+STATEMENT_CACHE_SIZE = 256  # prepared statements kept per connection (sqlite3 default is 128)
+CONFIG_TTL = 5.0  # seconds a cached config stays valid
+IDLE_SLEEP_MIN = 0.1  # seconds; idle wait doubles up to IDLE_SLEEP_MAX while the queue stays empty
+IDLE_SLEEP_MAX = 30.0
+MIN_SQLITE = (3, 35, 0)  # UPDATE ... RETURNING
+
+ISO = "%Y-%m-%dT%H:%M:%SZ"  # display format; timestamps are stored as INTEGER unix microseconds
+
+_CONFIG_CACHE: Optional[Dict[str, Any]] = None
+_CONFIG_LOADED_AT = 0.0
+_DELAYS: List[int] = []  # retry delay (seconds) by attempt number, refilled when the worker sees new config
+
+# Per-process connection pool: SQLite allows one writer at a time, so every write in a process goes through
+# a single long-lived connection, while read-only commands borrow from a small stack of read-only connections.
+_POOL_LOCK = threading.Lock()
+_POOL_PID: Optional[int] = None
+_WRITER: Optional[sqlite3.Connection] = None
+_READERS: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+_SCHEMA_CHECKED_PID: Optional[int] = None  # init_db() has confirmed the schema in this process
 
 # ----------------------------- Utility ----------------------------------
 
-def utcnow() -> datetime:
-    return datetime.now(timezone.utc)
+def now_us() -> int:
+    return time.time_ns() // 1000
 
-@contextmanager
-def db():
+
+def to_us(value: Any) -> int:
+    """Accept unix microseconds or an ISO-8601 string (naive = UTC) and return unix microseconds."""
+    if isinstance(value, (int, float)):
+        return int(value)
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp()) * 1_000_000 + dt.microsecond
+
+
+def dumps_line(obj: Dict[str, Any]) -> bytes:
+    """Compact UTF-8 JSON for one output line (newline included)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def fmt_ts(us: Optional[int]) -> Optional[str]:
+    if us is None:
+        return None
+    return datetime.fromtimestamp(us / 1e6, timezone.utc).strftime(ISO)
+
+def connect(read_only: bool = False) -> sqlite3.Connection:
     os.makedirs(APP_DIR, exist_ok=True)
-    conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)  # autocommit mode
+    if read_only:
+        uri = pathlib.Path(DB_PATH).resolve().as_uri() + "?mode=ro"  # as_uri() escapes '#', '?' and '%' in the path
+        conn = sqlite3.connect(uri, uri=True, timeout=30, isolation_level=None,
+                               cached_statements=STATEMENT_CACHE_SIZE)
+    else:
+        conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None,  # autocommit mode
+                               cached_statements=STATEMENT_CACHE_SIZE)
     conn.row_factory = sqlite3.Row
+    # WAL lets readers proceed while a worker holds the write lock; connect(timeout=30) already sets
+    # a 30 s busy handler, so BEGIN IMMEDIATE waits for the lock rather than failing with SQLITE_BUSY.
+    conn.executescript(
+        """
+        PRAGMA journal_mode=WAL;
+        PRAGMA synchronous=NORMAL;
+        PRAGMA temp_store=MEMORY;
+        PRAGMA mmap_size=268435456;
+        """
+    )
+    return conn
+
+
+def _check_pool_pid():
+    # connections must not cross fork(); a child starts with an empty pool
+    global _POOL_PID, _WRITER, _READERS
+    if _POOL_PID != os.getpid():
+        _POOL_PID, _WRITER, _READERS = os.getpid(), None, queue.LifoQueue()
+
+
+@contextmanager
+def db():
+    """Yield this process's writer connection, opening it on first use."""
+    global _WRITER
+    with _POOL_LOCK:
+        _check_pool_pid()
+        if _WRITER is None:
+            _WRITER = connect()
+        conn = _WRITER
+    try:
+        yield conn
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+
+
+@contextmanager
+def db_reader():
+    """Borrow a read-only connection for introspection commands."""
+    with _POOL_LOCK:
+        _check_pool_pid()
+        readers = _READERS
+    try:
+        conn = readers.get_nowait()
+    except queue.Empty:
+        conn = connect(read_only=True)
     try:
         yield conn
     finally:
-        conn.close()
+        readers.put(conn)
+
+
+def close_pool():
+    global _WRITER
+    with _POOL_LOCK:
+        _check_pool_pid()
+        while not _READERS.empty():
+            _READERS.get_nowait().close()
+        if _WRITER is not None:
+            _WRITER.close()
+            _WRITER = None
+
+
+# Bump whenever SCHEMA, the migrations below, or the config defaults change, so existing databases rerun init_db.
+SCHEMA_VERSION = 1
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        command TEXT NOT NULL,
+        state TEXT NOT NULL CHECK(state IN ('pending','processing','completed','failed','dead')),
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_retries INTEGER NOT NULL DEFAULT 3,
+        created_at INTEGER NOT NULL,
+        updated_at INTEGER NOT NULL,
+        run_at INTEGER NOT NULL,
+        locked_by TEXT,
+        locked_at INTEGER,
+        shard INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    # claim scan: equality on state, range on run_at, ordered by (run_at, created_at) with no sort step
+    "CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(state, run_at, created_at)",
+    """
+    CREATE TABLE IF NOT EXISTS dlq (
+        id TEXT PRIMARY KEY,
+        failed_at INTEGER NOT NULL,
+        reason TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_dlq_failed_at ON dlq(failed_at DESC)",
+    """
+    CREATE TABLE IF NOT EXISTS job_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        job_id TEXT NOT NULL,
+        ts INTEGER NOT NULL,
+        exit_code INTEGER,
+        stdout TEXT,
+        stderr TEXT
+    )
+    """,
+    # keep job_logs (and so the DB file) bounded; ids are monotonic thanks to AUTOINCREMENT
+    f"""
+    CREATE TRIGGER IF NOT EXISTS job_logs_cap AFTER INSERT ON job_logs BEGIN
+        DELETE FROM job_logs WHERE id <= NEW.id - {JOB_LOGS_KEEP};
+    END
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS config (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    )
+    """,
+)
 
 
-def init_db():
-    with db() as conn:
-        c = conn.cursor()
-        c.execute("PRAGMA journal_mode=WAL;")
-        c.execute(
-            """
-            CREATE TABLE IF NOT EXISTS jobs (
-                id TEXT PRIMARY KEY,
-                command TEXT NOT NULL,
-                state TEXT NOT NULL CHECK(state IN ('pending','processing','completed','failed','dead')),
-                attempts INTEGER NOT NULL DEFAULT 0,
-                max_retries INTEGER NOT NULL DEFAULT 3,
-                created_at TEXT NOT NULL,
-                updated_at TEXT NOT NULL,
-                run_at TEXT NOT NULL,
-                locked_by TEXT,
-                locked_at TEXT
-            );
-            """
-        )
-        c.execute(
-            """
-            CREATE TABLE IF NOT EXISTS dlq (
-                id TEXT PRIMARY KEY,
-                failed_at TEXT NOT NULL,
-                reason TEXT
-            );
-            """
-        )
-        c.execute(
-            """
-            CREATE TABLE IF NOT EXISTS job_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                job_id TEXT NOT NULL,
-                ts TEXT NOT NULL,
-                exit_code INTEGER,
-                stdout TEXT,
-                stderr TEXT
-            );
+def job_shard(job_id: str) -> int:
+    return zlib.crc32(job_id.encode("utf-8")) % JOB_SHARDS
+
+
+def _iso_to_us(col: str) -> str:
+    # ISO text -> unix micros (NULL if unparseable); leaves converted values alone so a repeated migration is harmless
+    return f"(CASE WHEN typeof({col})='text' THEN CAST(strftime('%s', {col}) AS INTEGER) * 1000000 ELSE {col} END)"
+
+
+def _us(*cols: str) -> str:
+    """First of `cols` that converts, else now, for NOT NULL columns that may hold free-form text
+    (the old schema accepted any string as run_at)."""
+    return f"COALESCE({', '.join(_iso_to_us(c) for c in cols)}, CAST(strftime('%s', 'now') AS INTEGER) * 1000000)"
+
+
+def _migrate_text_timestamps(conn: sqlite3.Connection):
+    """Rebuild tables created when timestamps were ISO TEXT columns."""
+    conn.execute("BEGIN IMMEDIATE")
+    cols = {r["name"]: r["type"] for r in conn.execute("PRAGMA table_info(jobs)")}
+    if cols.get("run_at", "").upper() != "TEXT":
+        conn.execute("COMMIT")
+        return
+    try:
+        conn.create_function("job_shard", 1, job_shard)
+        for t in ("jobs", "dlq", "job_logs"):
+            conn.execute(f"ALTER TABLE {t} RENAME TO {t}_text")
+        conn.execute("DROP INDEX IF EXISTS idx_jobs_claim")
+        conn.execute("DROP INDEX IF EXISTS idx_dlq_failed_at")
+        conn.execute("DROP TRIGGER IF EXISTS job_logs_cap")
+        for stmt in SCHEMA:
+            conn.execute(stmt)
+        conn.execute(
+            f"""
+            INSERT INTO jobs(id, command, state, attempts, max_retries, created_at, updated_at, run_at, locked_by, locked_at,
+                             shard)
+            SELECT id, command, state, attempts, max_retries, {_us('created_at', 'updated_at')}, {_us('updated_at', 'created_at')},
+                   {_us('run_at', 'created_at')},
+                   locked_by, {_iso_to_us('locked_at')}, job_shard(id)
+            FROM jobs_text
             """
         )
-        c.execute(
-            """
-            CREATE TABLE IF NOT EXISTS config (
-                key TEXT PRIMARY KEY,
-                value TEXT NOT NULL
-            );
+        conn.execute(f"INSERT INTO dlq(id, failed_at, reason) SELECT id, {_us('failed_at')}, reason FROM dlq_text")
+        conn.execute(
+            f"""
+            INSERT INTO job_logs(id, job_id, ts, exit_code, stdout, stderr)
+            SELECT id, job_id, {_us('ts')}, exit_code, stdout, stderr FROM job_logs_text
             """
         )
-        # defaults
-        c.execute("INSERT OR IGNORE INTO config(key,value) VALUES('base',?),('default_max_retries',?),('timeout',?)",
-                  (str(DEFAULT_BASE), str(DEFAULT_MAX_RETRIES), str(DEFAULT_TIMEOUT)))
+        for t in ("jobs", "dlq", "job_logs"):
+            conn.execute(f"DROP TABLE {t}_text")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def _add_shard_column(conn: sqlite3.Connection):
+    """Add jobs.shard to databases created before claims were sharded, backfilling pending jobs."""
+    conn.execute("BEGIN IMMEDIATE")
+    cols = {r["name"] for r in conn.execute("PRAGMA table_info(jobs)")}
+    if "shard" in cols:
+        conn.execute("COMMIT")
+        return
+    try:
+        conn.create_function("job_shard", 1, job_shard)
+        conn.execute("ALTER TABLE jobs ADD COLUMN shard INTEGER NOT NULL DEFAULT 0")
+        conn.execute("UPDATE jobs SET shard=job_shard(id) WHERE state='pending'")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
 
 
-def get_config() -> Dict[str, Any]:
+def init_db(read_only: bool = False):
+    """Create or migrate the schema. With `read_only`, an introspection command checks the version on its
+    reader connection and only opens the writer if there is setup to do."""
+    global _SCHEMA_CHECKED_PID
+    if _SCHEMA_CHECKED_PID == os.getpid():
+        return
+    if read_only and os.path.exists(DB_PATH):
+        with db_reader() as conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+                _SCHEMA_CHECKED_PID = os.getpid()
+                return
     with db() as conn:
-        cur = conn.execute("SELECT key, value FROM config")
-        out = {r[0]: r[1] for r in cur.fetchall()}
-        # cast ints where applicable
-        out["base"] = int(out.get("base", DEFAULT_BASE))
-        out["default_max_retries"] = int(out.get("default_max_retries", DEFAULT_MAX_RETRIES))
-        out["timeout"] = int(out.get("timeout", DEFAULT_TIMEOUT))
-        return out
+        # fast path for every command after the first: one PRAGMA read instead of the whole setup
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            _SCHEMA_CHECKED_PID = os.getpid()
+            return
+        c = conn.cursor()
+        _migrate_text_timestamps(conn)
+        for stmt in SCHEMA:
+            c.execute(stmt)
+        _add_shard_column(conn)
+        # defaults
+        c.execute("INSERT OR IGNORE INTO config(key,value) VALUES('base',?),('default_max_retries',?),('timeout',?),"
+                  "('max_backoff',?),('local_queue_size',?),('complete_job_batch_delay',?)",
+                  (str(DEFAULT_BASE), str(DEFAULT_MAX_RETRIES), str(DEFAULT_TIMEOUT), str(DEFAULT_MAX_BACKOFF),
+                   str(DEFAULT_LOCAL_QUEUE_SIZE), str(DEFAULT_BATCH_DELAY_MS)))
+        c.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    _SCHEMA_CHECKED_PID = os.getpid()
+
+
+def _read_config(conn: sqlite3.Connection) -> Dict[str, Any]:
+    cur = conn.execute("SELECT key, value FROM config")
+    out = {r[0]: r[1] for r in cur.fetchall()}
+    # cast ints where applicable
+    out["base"] = int(out.get("base", DEFAULT_BASE))
+    out["default_max_retries"] = int(out.get("default_max_retries", DEFAULT_MAX_RETRIES))
+    out["timeout"] = int(out.get("timeout", DEFAULT_TIMEOUT))
+    out["max_backoff"] = int(out.get("max_backoff", DEFAULT_MAX_BACKOFF))
+    out["local_queue_size"] = int(out.get("local_queue_size", DEFAULT_LOCAL_QUEUE_SIZE))
+    out["complete_job_batch_delay"] = int(out.get("complete_job_batch_delay", DEFAULT_BATCH_DELAY_MS))
+    return out
+
+
+def get_config(conn: Optional[sqlite3.Connection] = None) -> Dict[str, Any]:
+    """Return config, memoized for CONFIG_TTL seconds. Reuses `conn` when given instead of opening one."""
+    global _CONFIG_CACHE, _CONFIG_LOADED_AT
+    if _CONFIG_CACHE is not None and time.monotonic() - _CONFIG_LOADED_AT < CONFIG_TTL:
+        return _CONFIG_CACHE
+    if conn is not None:
+        out = _read_config(conn)
+    else:
+        with db() as c:
+            out = _read_config(c)
+    _CONFIG_CACHE, _CONFIG_LOADED_AT = out, time.monotonic()
+    return out
+
+
+def invalidate_config_cache(*_args):
+    global _CONFIG_CACHE
+    _CONFIG_CACHE = None
 
 
 def set_config(key: str, value: str):
     with db() as conn:
         conn.execute("INSERT INTO config(key,value) VALUES(?,?) ON CONFLICT(key) DO UPDATE SET value=excluded.value",
                      (key, value))
+    invalidate_config_cache()
 
 
 # ----------------------------- Enqueue -----------------------------------
 
 def enqueue_job(payload: Dict[str, Any]):
     cfg = get_config()
-    now = utcnow().strftime(ISO)
+    now = now_us()
     job_id = payload.get("id") or f"job-{int(time.time()*1000)}"
     command = payload["command"]
     max_retries = int(payload.get("max_retries", cfg["default_max_retries"]))
     state = payload.get("state", "pending")
     attempts = int(payload.get("attempts", 0))
-    run_at = payload.get("run_at") or now
+    try:
+        run_at = to_us(payload["run_at"]) if payload.get("run_at") else now
+    except (ValueError, TypeError, AttributeError):
+        print(f"Invalid run_at {payload['run_at']!r}: expected an ISO-8601 timestamp or unix microseconds.",
+              file=sys.stderr)
+        sys.exit(1)
 
     with db() as conn:
         try:
             conn.execute(
                 """
-                INSERT INTO jobs(id, command, state, attempts, max_retries, created_at, updated_at, run_at)
-                VALUES(?,?,?,?,?,?,?,?)
+                INSERT INTO jobs(id, command, state, attempts, max_retries, created_at, updated_at, run_at, shard)
+                VALUES(?,?,?,?,?,?,?,?,?)
                 """,
-                (job_id, command, state, attempts, max_retries, now, now, run_at)
+                (job_id, command, state, attempts, max_retries, now, now, run_at, job_shard(job_id))
             )
         except sqlite3.IntegrityError:
             print(f"Job with id '{job_id}' already exists.", file=sys.stderr)
             sys.exit(1)
+    notify_workers()
     print(job_id)
 
 # ----------------------------- Worker ------------------------------------
@@ -174,138 +444,475 @@ def request_workers_stop():
     os.makedirs(APP_DIR, exist_ok=True)
     with open(STOP_FILE, "w") as f:
         f.write(str(int(time.time())))
+    set_stop_flag(1)
+    notify_workers()  # idle workers see the flag now rather than after their backoff; each passes it on
+
+
+def open_wakeup_fifo() -> Optional[int]:
+    """Open (creating if needed) the FIFO idle workers wait on. None where FIFOs are unsupported."""
+    if not hasattr(os, "mkfifo"):
+        return None
+    os.makedirs(APP_DIR, exist_ok=True)
+    try:
+        os.mkfifo(WAKEUP_FIFO)
+    except FileExistsError:
+        pass
+    # O_RDWR keeps a writer attached, so select() blocks instead of reporting EOF when no enqueuer is connected
+    return os.open(WAKEUP_FIFO, os.O_RDWR | os.O_NONBLOCK)
+
+
+def wait_for_wakeup(fd: Optional[int], timeout: float):
+    if fd is None:
+        time.sleep(timeout)
+        return
+    ready, _, _ = select.select([fd], [], [], timeout)
+    if ready:
+        drain_wakeups(fd)
+
+
+def drain_wakeups(fd: Optional[int]):
+    """Discard queued notifications; a worker that is about to claim (or just did) has no use for them,
+    and left in the FIFO they would replay later as empty claims."""
+    if fd is None:
+        return
+    try:
+        while os.read(fd, 65536):
+            pass
+    except BlockingIOError:
+        pass  # empty, or another worker drained it
+
+
+def notify_workers(count: int = 1):
+    """Wake up to `count` idle workers. No-op when no worker is listening."""
+    try:
+        fd = os.open(WAKEUP_FIFO, os.O_WRONLY | os.O_NONBLOCK)
+    except OSError:
+        return  # no FIFO yet, no reader (ENXIO), or unsupported platform
+    try:
+        os.write(fd, b"\0" * count)
+    except OSError:
+        pass  # pipe full: workers are already awake
+    finally:
+        os.close(fd)
 
 
 def clear_workers_stop_flag():
     if os.path.exists(STOP_FILE):
         os.remove(STOP_FILE)
+    set_stop_flag(0)
 
 
-def claim_next_job(conn: sqlite3.Connection, worker_id: str) -> Optional[sqlite3.Row]:
-    """Atomically move one eligible job from pending->processing and return it."""
-    now = utcnow().strftime(ISO)
-    # BEGIN IMMEDIATE takes a reserved lock to avoid races across processes
-    conn.execute("BEGIN IMMEDIATE")
-    row = conn.execute(
-        """
-        SELECT id, command, attempts, max_retries FROM jobs
-        WHERE state='pending' AND run_at<=?
-        ORDER BY created_at ASC
-        LIMIT 1
-        """,
-        (now,)
-    ).fetchone()
-    if not row:
-        conn.execute("COMMIT")
-        return None
-    updated = conn.execute(
-        """
-        UPDATE jobs SET state='processing', locked_by=?, locked_at=?, updated_at=?
-        WHERE id=? AND state='pending'
-        """,
-        (worker_id, now, now, row["id"])
+def set_stop_flag(value: int):
+    os.makedirs(APP_DIR, exist_ok=True)
+    # rewrite in place: truncating a file that workers have mapped would fault their reads
+    fd = os.open(STOP_FLAG, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, bytes([value]))
+    finally:
+        os.close(fd)
+
+
+def open_stop_flag() -> mmap.mmap:
+    """Map STOP_FLAG so workers can poll it with a memory read instead of a stat() per iteration."""
+    if not os.path.exists(STOP_FLAG):
+        set_stop_flag(0)
+    with open(STOP_FLAG, "r+b") as f:
+        return mmap.mmap(f.fileno(), 1)
+
+
+# Hot-path statements, kept as module constants so each execute() hits the connection's statement cache.
+# a single UPDATE ... RETURNING is atomic, so one transaction (and one fsync) covers a whole claim batch
+_SQL_CLAIM = """
+    UPDATE jobs SET state='processing', locked_by=?, locked_at=?, updated_at=?
+    WHERE id IN (
+        SELECT id FROM jobs
+        WHERE state='pending' AND run_at<=? AND shard % ? = ?
+        ORDER BY run_at ASC, created_at ASC
+        LIMIT ?
     )
-    if updated.rowcount != 1:
-        conn.execute("ROLLBACK")
+    RETURNING id, command, attempts, max_retries, run_at, created_at
+"""
+_SQL_RELEASE = ("UPDATE jobs SET state='pending', locked_by=NULL, locked_at=NULL "
+                "WHERE id=? AND state='processing' AND locked_by=?")
+_SQL_COMPLETE = "UPDATE jobs SET state='completed', updated_at=?, locked_by=NULL, locked_at=NULL WHERE id=?"
+_SQL_FAIL_DEAD = "UPDATE jobs SET state='dead', attempts=?, updated_at=?, locked_by=NULL, locked_at=NULL WHERE id=?"
+# upsert updates a re-failed entry in place; INSERT OR REPLACE would delete and re-insert it
+_SQL_DLQ_UPSERT = """
+    INSERT INTO dlq(id, failed_at, reason) VALUES(?,?,?)
+    ON CONFLICT(id) DO UPDATE SET failed_at=excluded.failed_at, reason=excluded.reason
+"""
+_SQL_FAIL_RETRY = """
+    UPDATE jobs
+    SET state='pending', attempts=?, run_at=?, updated_at=?, locked_by=NULL, locked_at=NULL
+    WHERE id=?
+"""
+_SQL_INSERT_LOG = "INSERT INTO job_logs(job_id, ts, exit_code, stdout, stderr) VALUES(?,?,?,?,?)"
+_SQL_NEXT_RUN_AT = "SELECT MIN(run_at) FROM jobs WHERE state='pending'"
+
+
+def claim_next_jobs(conn: sqlite3.Connection, worker_id: str, limit: int,
+                    slot: int = 0, count: int = 1) -> List[sqlite3.Row]:
+    """Atomically move up to `limit` eligible jobs from pending->processing and return them, earliest run_at first.
+
+    Worker `slot` of `count` claims from its own shards first so concurrent workers rarely compete for
+    the same rows; when those are empty it takes from any shard so no job waits on a busy worker.
+    """
+    now = now_us()
+    rows = []
+    for n, i in ((count, slot), (1, 0)):
+        rows = conn.execute(_SQL_CLAIM, (worker_id, now, now, now, n, i, limit)).fetchall()
+        if rows or n == 1:
+            break
+    # RETURNING order is unspecified
+    rows.sort(key=lambda r: (r["run_at"], r["created_at"]))
+    return rows
+
+
+def seconds_until_next_job(conn: sqlite3.Connection) -> Optional[float]:
+    """Time until the earliest pending job (e.g. a backed-off retry) becomes runnable; None if there is none."""
+    run_at = conn.execute(_SQL_NEXT_RUN_AT).fetchone()[0]
+    if run_at is None:
         return None
-    conn.execute("COMMIT")
-    return row
+    return max(0.0, (run_at - now_us()) / 1e6)
 
 
-def complete_job(conn: sqlite3.Connection, job_id: str):
-    now = utcnow().strftime(ISO)
-    conn.execute(
-        "UPDATE jobs SET state='completed', updated_at=?, locked_by=NULL, locked_at=NULL WHERE id=?",
-        (now, job_id),
-    )
+def release_jobs(conn: sqlite3.Connection, worker_id: str, job_ids: List[str]):
+    """Hand claimed-but-unstarted jobs back to the pending pool."""
+    conn.executemany(_SQL_RELEASE, [(job_id, worker_id) for job_id in job_ids])
 
 
-def fail_job_with_retry(conn: sqlite3.Connection, job_id: str, attempts: int, max_retries: int, reason: str):
-    cfg = get_config()
-    base = cfg["base"]
-    now_dt = utcnow()
-    next_attempt = attempts + 1
-    if next_attempt > max_retries:
-        # move to DLQ
-        conn.execute("UPDATE jobs SET state='dead', attempts=?, updated_at=?, locked_by=NULL, locked_at=NULL WHERE id=?",
-                     (next_attempt, now_dt.strftime(ISO), job_id))
-        conn.execute("INSERT OR REPLACE INTO dlq(id, failed_at, reason) VALUES(?,?,?)",
-                     (job_id, now_dt.strftime(ISO), reason[:500]))
-        return
-    delay_seconds = base ** attempts  # attempts before increment (0,1,2,..)
-    run_at = (now_dt + timedelta(seconds=delay_seconds)).strftime(ISO)
-    conn.execute(
-        """
-        UPDATE jobs
-        SET state='pending', attempts=?, run_at=?, updated_at=?, locked_by=NULL, locked_at=NULL
-        WHERE id=?
-        """,
-        (next_attempt, run_at, now_dt.strftime(ISO), job_id),
-    )
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True  # exists but isn't ours, or we can't tell; leave its jobs alone
+    return True
+
+
+def make_worker_id() -> str:
+    # the host part keeps recovery from judging another host's (or container's) pids against our own
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def recover_orphaned_jobs(conn: sqlite3.Connection) -> int:
+    """Release `processing` jobs held by workers of this host that no longer exist (e.g. SIGKILLed before
+    they could release their local queue). Jobs locked by other hosts, or by ids without a host, are left."""
+    prefix = socket.gethostname() + ":"
+    owners = [r[0] for r in conn.execute("SELECT DISTINCT locked_by FROM jobs WHERE state='processing'")]
+    dead = [o for o in owners
+            if o and o.startswith(prefix) and o[len(prefix):].isdigit() and not _pid_alive(int(o[len(prefix):]))]
+    if not dead:
+        return 0
+    cur = conn.executemany("UPDATE jobs SET state='pending', locked_by=NULL, locked_at=NULL "
+                           "WHERE state='processing' AND locked_by=?", [(o,) for o in dead])
+    return cur.rowcount
+
+
+def _capped_powers(base: int, cap: int, count: int) -> List[int]:
+    """[min(base ** a, cap) for a in range(count)] without ever computing a power past `cap`."""
+    out, d = [], 1
+    for _ in range(count):
+        out.append(min(d, cap))
+        if d < cap:
+            d *= base
+    return out
+
+
+def precompute_delays(cfg: Dict[str, Any]):
+    global _DELAYS
+    _DELAYS = _capped_powers(cfg["base"], cfg["max_backoff"], cfg["default_max_retries"] + 2)
+
+
+def backoff_delay(attempts: int, base: int, max_backoff: int) -> float:
+    """Seconds to wait before retrying after `attempts` failures: capped base ** attempts, with jitter."""
+    if attempts < len(_DELAYS):
+        delay = _DELAYS[attempts]
+    else:  # job with a larger max_retries than the default
+        delay, a = (1, attempts) if base == 1 or attempts == 0 else (base, 1)  # 0 ** n and 1 ** n never grow
+        while a < attempts and 0 < delay < max_backoff:
+            delay, a = delay * base, a + 1
+        delay = min(delay, max_backoff)
+    return delay * random.uniform(1 - BACKOFF_JITTER, 1 + BACKOFF_JITTER)
+
+
+class WriteBuffer:
+    """Collects job result writes and commits them together: one executemany() per statement and one
+    transaction (so one WAL fsync) for every job finished since the last flush."""
+
+    def __init__(self, max_delay: float):
+        self.max_delay = max_delay  # seconds
+        self.first_at: Optional[float] = None  # when the oldest unflushed write was buffered
+        self.pending_logs: List[tuple] = []
+        self.pending_completes: List[tuple] = []
+        self.pending_retries: List[tuple] = []
+        self.pending_dead: List[tuple] = []
+        self.pending_dlq: List[tuple] = []
+
+    def _touch(self):
+        if self.first_at is None:
+            self.first_at = time.monotonic()
+
+    def log_job_result(self, job_id: str, exit_code: int, stdout: str, stderr: str):
+        self._touch()
+        self.pending_logs.append((job_id, now_us(), exit_code, stdout, stderr))
+
+    def complete_job(self, job_id: str):
+        self._touch()
+        self.pending_completes.append((now_us(), job_id))
+
+    def fail_job_with_retry(self, job_id: str, attempts: int, max_retries: int, reason: str,
+                            base: int, max_backoff: int):
+        self._touch()
+        now = now_us()
+        next_attempt = attempts + 1
+        if next_attempt > max_retries:
+            # move to DLQ; the jobs update and the DLQ upsert are committed in the same transaction
+            self.pending_dead.append((next_attempt, now, job_id))
+            self.pending_dlq.append((job_id, now, reason[:500]))
+            return
+        delay_seconds = backoff_delay(attempts, base, max_backoff)  # attempts before increment (0,1,2,..)
+        run_at = now + int(delay_seconds * 1_000_000)
+        self.pending_retries.append((next_attempt, run_at, now, job_id))
+
+    def due(self) -> bool:
+        return self.first_at is not None and time.monotonic() - self.first_at >= self.max_delay
+
+    def flush_if_due(self, conn: sqlite3.Connection) -> Optional[float]:
+        """Flush if the oldest write has waited `max_delay`; return seconds until the next flush is due,
+        or None when nothing is buffered."""
+        if self.due():
+            self.flush(conn)
+        if self.first_at is None:
+            return None
+        return max(0.0, self.first_at + self.max_delay - time.monotonic())
+
+    def flush(self, conn: sqlite3.Connection):
+        batches = ((_SQL_INSERT_LOG, self.pending_logs), (_SQL_COMPLETE, self.pending_completes),
+                   (_SQL_FAIL_RETRY, self.pending_retries), (_SQL_FAIL_DEAD, self.pending_dead),
+                   (_SQL_DLQ_UPSERT, self.pending_dlq))
+        if self.first_at is None:
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for sql, rows in batches:
+                if rows:
+                    conn.executemany(sql, rows)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        for _, rows in batches:
+            rows.clear()
+        self.first_at = None
+
+
+# anything the shell would interpret (operators, quoting, expansion, globbing, comments, assignments)
+_SHELL_META = re.compile(r'[|&;<>()$`\\"\'*?[\]#~=%{}!\n]')
+
+
+@lru_cache(maxsize=256)
+def _on_path(program: str) -> bool:
+    return shutil.which(program) is not None
+
+
+def split_simple_command(command: str) -> Optional[List[str]]:
+    """Return argv if `command` needs no shell to run (plain words, program on PATH), else None."""
+    if os.name == 'nt' or _SHELL_META.search(command):
+        return None
+    argv = command.split()
+    # builtins such as `exit` or `cd` have no executable and must go through the shell
+    if not argv or not _on_path(argv[0]):
+        return None
+    return argv
 
 
-def log_job_result(conn: sqlite3.Connection, job_id: str, exit_code: int, stdout: str, stderr: str):
-    conn.execute(
-        "INSERT INTO job_logs(job_id, ts, exit_code, stdout, stderr) VALUES(?,?,?,?,?)",
-        (job_id, utcnow().strftime(ISO), exit_code, stdout, stderr),
+def _read_tail(stream, chunks: deque, seen: List[int], stop: threading.Event):
+    """Drain `stream` into `chunks`, a bounded deque, so only the last OUTPUT_CAP bytes are kept.
+    Gives up (and closes the pipe) once `stop` is set, even if something still holds the write end."""
+    fd = stream.fileno()
+    with stream:
+        while not stop.is_set():
+            # raw reads behind select() so `stop` is noticed; a blocked buffered read can't be interrupted
+            if os.name != 'nt' and not select.select([fd], [], [], 0.5)[0]:
+                continue
+            chunk = os.read(fd, OUTPUT_CHUNK)
+            if not chunk:
+                return
+            chunks.append(chunk)
+            seen[0] += len(chunk)
+
+
+def _tail_text(chunks: deque, seen: int) -> str:
+    data = b"".join(chunks)
+    text = data.decode("utf-8", errors="replace")
+    if seen > len(data):
+        text = f"[truncated {seen - len(data)} bytes]\n" + text
+    return text
+
+
+def _wait(proc: subprocess.Popen, timeout: float, tick: Optional[Callable[[], Optional[float]]]) -> int:
+    """proc.wait(timeout), calling `tick` whenever the seconds it last returned have elapsed."""
+    deadline = time.monotonic() + timeout
+    while True:
+        step = tick() if tick is not None else None
+        remaining = deadline - time.monotonic()
+        try:
+            return proc.wait(timeout=remaining if step is None else min(max(remaining, 0), step))
+        except subprocess.TimeoutExpired:
+            if time.monotonic() >= deadline:
+                raise
+
+
+def _spawn(args, shell: bool) -> subprocess.Popen:
+    return subprocess.Popen(
+        args,
+        shell=shell,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        executable="/bin/sh" if shell and os.name != 'nt' else None,
+        start_new_session=os.name != 'nt',  # own process group, so a timeout can kill the whole pipeline
     )
 
 
-def run_command(command: str, timeout: int) -> (int, str, str):
+def run_command(command: str, timeout: int,
+                tick: Optional[Callable[[], Optional[float]]] = None) -> (int, str, str):
+    argv = split_simple_command(command)
     try:
-        completed = subprocess.run(
-            command,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            timeout=timeout,
-            executable="/bin/sh" if os.name != 'nt' else None,
-            text=True,
-        )
-        return completed.returncode, completed.stdout, completed.stderr
-    except subprocess.TimeoutExpired as e:
-        return 124, e.stdout or "", e.stderr or "timeout"
+        try:
+            proc = _spawn(argv or command, shell=argv is None)
+        except OSError as e:
+            if argv is None or e.errno != errno.ENOEXEC:
+                raise
+            proc = _spawn(command, shell=True)  # script without a #! line: sh interprets it, as it would have
     except FileNotFoundError as e:
         return 127, "", str(e)
+    except PermissionError as e:
+        return 126, "", str(e)  # what sh reports for a file it can't execute
     except Exception as e:
         return 1, "", str(e)
-
-
-def worker_loop():
+    # read both pipes concurrently (a full pipe would block the child) and keep only their tails
+    readers, stop = [], threading.Event()
+    for pipe in (proc.stdout, proc.stderr):
+        chunks, seen = deque(maxlen=OUTPUT_CAP // OUTPUT_CHUNK), [0]
+        t = threading.Thread(target=_read_tail, args=(pipe, chunks, seen, stop), daemon=True)
+        t.start()
+        readers.append((t, chunks, seen))
+    timed_out = False
+    try:
+        exit_code = _wait(proc, timeout, tick)
+    except subprocess.TimeoutExpired:
+        if os.name != 'nt':
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        else:
+            proc.kill()
+        proc.wait()
+        timed_out = True
+    grace = time.monotonic() + 1.0
+    for t, _, _ in readers:
+        # after a kill, a process that left the group may still hold the pipe open; don't wait on it forever
+        t.join(max(0.0, grace - time.monotonic()) if timed_out else None)
+    stop.set()  # readers close their pipes on the way out, so nothing keeps draining
+    for t, _, _ in readers:
+        t.join()
+    out, err = (_tail_text(chunks, seen[0]) for _, chunks, seen in readers)
+    if timed_out:
+        return 124, out, err or "timeout"
+    if exit_code < 0:
+        exit_code = 128 - exit_code  # killed by a signal: report it the way /bin/sh does (e.g. 137 for SIGKILL)
+    return exit_code, out, err
+
+
+def worker_loop(slot: int = 0, count: int = 1):
     init_db()
-    cfg = get_config()
-    timeout = cfg["timeout"]
-    worker_id = f"{os.getpid()}"
-    signal.signal(signal.SIGTERM, lambda *args: None)  # allow graceful exit check via file
-    with db() as conn:
-        idle_sleep = 1.0
-        while True:
-            if graceful_stop_requested():
-                # finish current cycle then exit
-                break
-            job = claim_next_job(conn, worker_id)
-            if not job:
-                time.sleep(idle_sleep)
-                continue
-            job_id = job["id"]
-            attempts = int(job["attempts"])
-            max_retries = int(job["max_retries"])
-
-            exit_code, out, err = run_command(job["command"], timeout)
-            log_job_result(conn, job_id, exit_code, out, err)
-            if exit_code == 0:
-                complete_job(conn, job_id)
-            else:
-                fail_job_with_retry(conn, job_id, attempts, max_retries, reason=f"exit_code={exit_code}: {err}")
-        # loop end
+    worker_id = make_worker_id()
+    sys.setswitchinterval(0.05)  # fewer GIL handoffs with subprocess I/O threads
+    signal.signal(signal.SIGTERM, lambda *args: None)  # allow graceful exit check via stop flag
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, invalidate_config_cache)  # reload config on next use
+    try:
+        with db() as conn:
+            cfg: Optional[Dict[str, Any]] = None  # applied below before every claim
+            writes = WriteBuffer(DEFAULT_BATCH_DELAY_MS / 1000.0)
+            local = deque()
+            wakeup_fd = open_wakeup_fifo()
+            stop_flag = open_stop_flag()
+            idle_sleep = IDLE_SLEEP_MIN
+            try:
+                # STOP_FILE is only consulted here, in case a stop was requested before we mapped the flag
+                if graceful_stop_requested():
+                    return
+                while True:
+                    if stop_flag[0]:
+                        # finish current cycle then exit; a woken worker drains the FIFO, so wake the next one
+                        notify_workers()
+                        break
+                    if not local:
+                        # commit pending results before claiming so a refill never races our own writes
+                        writes.flush(conn)
+                        # re-read per batch so `config set` / SIGHUP reach running workers; cached for CONFIG_TTL
+                        latest = get_config(conn)
+                        if latest is not cfg:
+                            if cfg is None or any(latest[k] != cfg[k] for k in ("base", "max_backoff",
+                                                                                "default_max_retries")):
+                                precompute_delays(latest)
+                            cfg = latest
+                            timeout = cfg["timeout"]
+                            base, max_backoff = cfg["base"], cfg["max_backoff"]
+                            batch_size = max(1, cfg["local_queue_size"])
+                            writes.max_delay = cfg["complete_job_batch_delay"] / 1000.0
+                        local.extend(claim_next_jobs(conn, worker_id, batch_size, slot, count))
+                        if not local:
+                            # scheduled retries don't notify the FIFO, so never sleep past the next run_at
+                            next_due = seconds_until_next_job(conn)
+                            wait_for_wakeup(wakeup_fd, idle_sleep if next_due is None else min(idle_sleep, next_due))
+                            idle_sleep = min(idle_sleep * 2, IDLE_SLEEP_MAX)
+                            continue
+                        idle_sleep = IDLE_SLEEP_MIN
+                        drain_wakeups(wakeup_fd)
+                        if len(local) == batch_size:
+                            notify_workers()  # there may be more; wake a peer instead of leaving it idle
+                    job = local.popleft()
+                    job_id = job["id"]
+                    attempts = int(job["attempts"])
+                    max_retries = int(job["max_retries"])
+
+                    # keep committing earlier results on schedule while a long job runs
+                    exit_code, out, err = run_command(job["command"], timeout, lambda: writes.flush_if_due(conn))
+                    writes.log_job_result(job_id, exit_code, out, err)
+                    if exit_code == 0:
+                        writes.complete_job(job_id)
+                    else:
+                        writes.fail_job_with_retry(job_id, attempts, max_retries, f"exit_code={exit_code}: {err}",
+                                                   base, max_backoff)
+                    writes.flush_if_due(conn)
+            finally:
+                writes.flush(conn)
+                release_jobs(conn, worker_id, [j["id"] for j in local])
+                stop_flag.close()
+                if wakeup_fd is not None:
+                    os.close(wakeup_fd)
+    finally:
+        close_pool()
 
 
 def start_workers(count: int):
     init_db()
+    with db() as conn:
+        recovered = recover_orphaned_jobs(conn)
+    if recovered:
+        print(f"Released {recovered} job(s) left in processing by workers that are no longer running.")
+    close_pool()  # don't hand the parent's connection to forked workers
     clear_workers_stop_flag()
+    # fork skips re-importing this module in every child; spawn only where fork doesn't exist (Windows)
+    ctx = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else None)
     procs = []
-    for _ in range(count):
-        p = Process(target=worker_loop)
+    for slot in range(count):
+        p = ctx.Process(target=worker_loop, args=(slot, count))
         p.daemon = False
         p.start()
         procs.append(p)
@@ -320,22 +927,37 @@ def stop_workers():
 # ----------------------------- Introspection -----------------------------
 
 def status():
-    init_db()
-    with db() as conn:
-        cur = conn.execute("SELECT state, COUNT(*) as c FROM jobs GROUP BY state")
+    init_db(read_only=True)
+    with db_reader() as conn:
+        # GROUP BY state is answered from idx_jobs_claim (covering), the DLQ count rides along in the same query
+        cur = conn.execute("SELECT state, COUNT(*) as c FROM jobs GROUP BY state "
+                           "UNION ALL SELECT '__dlq__', COUNT(*) FROM dlq")
         counts = {r[0]: r[1] for r in cur.fetchall()}
+        dlq_count = counts.pop("__dlq__")
         total = sum(counts.values())
         print("Jobs:")
         for st in ["pending","processing","completed","failed","dead"]:
             print(f"  {st:10s} {counts.get(st,0)}")
         print(f"  {'total':10s} {total}")
+        print(f"DLQ entries: {dlq_count}")
         # show stop flag
         print(f"Workers stop flag: {'present' if graceful_stop_requested() else 'absent'}")
 
 
+def write_json_lines(cur: sqlite3.Cursor, to_obj):
+    """Stream query results to stdout as JSON lines, FETCH_SIZE rows at a time, so memory stays flat."""
+    cur.arraysize = FETCH_SIZE
+    out = sys.stdout.buffer
+    while True:
+        rows = cur.fetchmany()
+        if not rows:
+            break
+        out.writelines([dumps_line(to_obj(r)) for r in rows])
+
+
 def list_jobs(state: Optional[str]):
-    init_db()
-    with db() as conn:
+    init_db(read_only=True)
+    with db_reader() as conn:
         if state:
             cur = conn.execute(
                 "SELECT id, command, state, attempts, max_retries, run_at, updated_at FROM jobs WHERE state=? ORDER BY created_at",
@@ -343,25 +965,22 @@ def list_jobs(state: Optional[str]):
         else:
             cur = conn.execute(
                 "SELECT id, command, state, attempts, max_retries, run_at, updated_at FROM jobs ORDER BY created_at")
-        rows = cur.fetchall()
-        for r in rows:
-            print(json.dumps({
-                "id": r["id"],
-                "command": r["command"],
-                "state": r["state"],
-                "attempts": r["attempts"],
-                "max_retries": r["max_retries"],
-                "run_at": r["run_at"],
-                "updated_at": r["updated_at"],
-            }))
+        write_json_lines(cur, lambda r: {
+            "id": r["id"],
+            "command": r["command"],
+            "state": r["state"],
+            "attempts": r["attempts"],
+            "max_retries": r["max_retries"],
+            "run_at": fmt_ts(r["run_at"]),
+            "updated_at": fmt_ts(r["updated_at"]),
+        })
 
 
 def dlq_list():
-    init_db()
-    with db() as conn:
+    init_db(read_only=True)
+    with db_reader() as conn:
         cur = conn.execute("SELECT id, failed_at, reason FROM dlq ORDER BY failed_at DESC")
-        for r in cur.fetchall():
-            print(json.dumps({"id": r["id"], "failed_at": r["failed_at"], "reason": r["reason"] or ""}))
+        write_json_lines(cur, lambda r: {"id": r["id"], "failed_at": fmt_ts(r["failed_at"]), "reason": r["reason"] or ""})
 
 
 def dlq_retry(job_id: str):
@@ -371,7 +990,7 @@ def dlq_retry(job_id: str):
         if not job:
             print(f"No DLQ job with id '{job_id}'.", file=sys.stderr)
             sys.exit(1)
-        now = utcnow().strftime(ISO)
+        now = now_us()
         conn.execute("DELETE FROM dlq WHERE id=?", (job_id,))
         conn.execute(
             """
@@ -380,7 +999,8 @@ def dlq_retry(job_id: str):
             """,
             (now, now, job_id),
         )
-        print(f"Requeued {job_id}")
+    notify_workers()
+    print(f"Requeued {job_id}")
 
 # ----------------------------- Config CLI --------------------------------
 
@@ -388,17 +1008,17 @@ def config_get(key: Optional[str]):
     cfg = get_config()
     if key:
         if key not in cfg:
-            print(f"Unknown key '{key}'. Known: base, default_max_retries, timeout", file=sys.stderr)
+            print(f"Unknown key '{key}'. Known: {', '.join(CONFIG_KEYS)}", file=sys.stderr)
             sys.exit(1)
         print(f"{key}={cfg[key]}")
     else:
-        for k in ["base","default_max_retries","timeout"]:
+        for k in CONFIG_KEYS:
             print(f"{k}={cfg[k]}")
 
 
 def config_set(key: str, value: str):
-    if key not in {"base","default_max_retries","timeout"}:
-        print("Allowed keys: base, default_max_retries, timeout", file=sys.stderr)
+    if key not in CONFIG_KEYS:
+        print(f"Allowed keys: {', '.join(CONFIG_KEYS)}", file=sys.stderr)
         sys.exit(1)
     # basic validation
     try:
@@ -422,7 +1042,11 @@ def parse_json_or_file(arg: str) -> Dict[str, Any]:
 
 
 def main():
-    init_db()
+    if sqlite3.sqlite_version_info < MIN_SQLITE:
+        print(f"queuectl needs SQLite {'.'.join(map(str, MIN_SQLITE))}+, but Python is linked against "
+              f"SQLite {sqlite3.sqlite_version}.", file=sys.stderr)
+        sys.exit(1)
+    atexit.register(close_pool)
     parser = argparse.ArgumentParser(prog="queuectl", description="Minimal job queue with workers and DLQ (SQLite)")
     sub = parser.add_subparsers(dest="cmd")
 
@@ -451,10 +1075,12 @@ def main():
     p_cget = subc.add_parser("get", help="Get all or one key")
     p_cget.add_argument("key", nargs="?")
     p_cset = subc.add_parser("set", help="Set a key")
-    p_cset.add_argument("key", choices=["base","default_max_retries","timeout"])
+    p_cset.add_argument("key", choices=CONFIG_KEYS)
     p_cset.add_argument("value")
 
     args = parser.parse_args()
+    # introspection commands stay on one read-only connection
+    init_db(read_only=args.cmd in ("status", "list") or (args.cmd == "dlq" and args.dcmd == "list"))
 
     if args.cmd == "enqueue":
         payload = parse_json_or_file(args.payload)